@@ -1,9 +1,21 @@
+import asyncio
+import functools
+import gzip
+import itertools
 import os
 import json
-import time
 import random
-from typing import List, Dict, Optional
-
+import sqlite3
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Dict, Optional, Set
+
+import requests
+from aiolimiter import AsyncLimiter
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from youtube_transcript_api import (
     YouTubeTranscriptApi,
     TranscriptsDisabled,
@@ -12,6 +24,13 @@ from youtube_transcript_api import (
 )
 import yt_dlp
 
+# orjson serializes straight to UTF-8 bytes in C and is several times
+# faster than stdlib json; fall back gracefully if it is not installed.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 
 # ==========================
 # CONFIGURATION
@@ -23,9 +42,18 @@ PLAYLIST_URL = "https://www.youtube.com/playlist?list=PLXrRC--1DgPab9DaC_WSUsrME
 # Output folder for saved transcripts
 OUTPUT_DIR = "transcripts"
 
-# Delay between processing videos (in seconds)
-MIN_DELAY_SECONDS = 5
-MAX_DELAY_SECONDS = 20
+# Pretty-print saved JSON. Compact output serializes faster and is
+# roughly 40% smaller; flip on only if you read the files by hand.
+PRETTY = False
+
+# Global politeness budget: how many YouTube requests all workers may
+# make per minute combined (token bucket, so no worker idles while
+# tokens are available).
+REQUESTS_PER_MINUTE = 6
+
+# Small random stagger between task dispatches, so workers do not queue
+# up on the rate limiter in lockstep bursts.
+SUBMIT_JITTER_SECONDS = (0.1, 0.3)
 
 # Batch settings: after this many videos, take a longer rest
 BATCH_SIZE = 100
@@ -35,73 +63,300 @@ BATCH_REST_SECONDS = 5 * 60  # 5 minutes
 # Add more if needed, for example ["tr", "en"] for Turkish + English.
 PREFERRED_LANGUAGES = ["tr", "en"]
 
+# How many transcript fetches may be in flight at the same time.
+MAX_CONCURRENT_FETCHES = 8
+
+# Local cache of fetched transcripts, so re-runs (e.g. after a partial
+# failure) never hit YouTube for videos we already downloaded.
+CACHE_DB_PATH = "transcript_cache.sqlite3"
+
+# Playlists longer than this are enumerated with several parallel
+# yt-dlp calls over disjoint playlist_items ranges; shorter ones keep
+# the single-call path.
+PARALLEL_EXTRACT_THRESHOLD = 1000
+PARALLEL_EXTRACT_WORKERS = 4
+PARALLEL_EXTRACT_CHUNK = 500
+
 
 # ==========================
 # PLAYLIST HANDLING (yt-dlp)
 # ==========================
 
-def get_videos_from_playlist(playlist_url: str) -> List[Dict[str, str]]:
+_YDL_OPTS = {
+    "quiet": True,
+    "skip_download": True,
+    "extract_flat": "in_playlist",  # do not resolve each video in full
+}
+
+
+def _extract_info(playlist_url: str, playlist_items: Optional[str] = None) -> Dict:
     """
-    Use yt-dlp to extract basic info (id, title) for each video
-    in the playlist (or single video URL).
+    Run one flat, fully processed yt-dlp extraction, optionally limited
+    to a playlist_items range like "501-1000". Processing materializes
+    the entries list, so keep ranges bounded when memory matters.
     """
-    ydl_opts = {
-        "quiet": True,
-        "skip_download": True,
-        "extract_flat": "in_playlist",  # do not resolve each video in full
-    }
+    ydl_opts = dict(_YDL_OPTS)
+    if playlist_items is not None:
+        ydl_opts["playlist_items"] = playlist_items
 
     with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-        info = ydl.extract_info(playlist_url, download=False)
+        return ydl.extract_info(playlist_url, download=False)
 
-    videos: List[Dict[str, str]] = []
 
-    # If it's a playlist, "entries" will be present.
-    if "entries" in info:
-        for entry in info["entries"]:
-            if not entry:
-                continue
-            video_id = entry.get("id")
-            title = entry.get("title") or ""
-            if video_id:
-                videos.append({"id": video_id, "title": title})
-    else:
-        # Single video URL
-        video_id = info.get("id")
-        title = info.get("title") or ""
-        if video_id:
-            videos.append({"id": video_id, "title": title})
+def _iter_entries(info: Dict) -> Iterator[Dict[str, str]]:
+    """
+    Yield {id, title} dicts from one extraction result. Playlists carry
+    "entries" (possibly a lazy iterator); a single video URL is treated
+    as a one-entry playlist.
+    """
+    entries = info.get("entries") or ([info] if info.get("id") else [])
+    return (
+        {"id": entry["id"], "title": entry.get("title") or ""}
+        for entry in entries
+        if entry and entry.get("id")
+    )
+
+
+def iter_videos_from_playlist(playlist_url: str) -> Iterator[Dict[str, str]]:
+    """
+    Use yt-dlp to extract basic info (id, title) for each video
+    in the playlist (or single video URL), yielding entries as they
+    come in so fetching can start before the whole playlist has been
+    enumerated (and without holding the full list in memory).
+
+    yt-dlp pages playlist entries serially, which dominates startup for
+    very long playlists; those are enumerated with several extractions
+    over disjoint playlist_items ranges running in a thread pool,
+    merged back in playlist order (each range is processed, so memory
+    stays bounded by the range size).
+    """
+    # Cheap single-entry probe to learn the playlist length.
+    probe = _extract_info(playlist_url, playlist_items="1")
+    count = probe.get("playlist_count") or 0
+
+    if count <= PARALLEL_EXTRACT_THRESHOLD:
+        # Unprocessed extraction is the only path where yt-dlp hands
+        # back "entries" as a true generator; processing (the default)
+        # runs the playlist to completion inside extract_info and
+        # returns a materialized list. Entries must be consumed inside
+        # the with block: closing the YoutubeDL tears down its request
+        # director, which the lazy generator still needs.
+        with yt_dlp.YoutubeDL(dict(_YDL_OPTS)) as ydl:
+            info = ydl.extract_info(playlist_url, download=False, process=False)
+            yield from _iter_entries(info)
+        return
+
+    ranges = [
+        f"{start}-{min(start + PARALLEL_EXTRACT_CHUNK - 1, count)}"
+        for start in range(1, count + 1, PARALLEL_EXTRACT_CHUNK)
+    ]
+    with ThreadPoolExecutor(max_workers=PARALLEL_EXTRACT_WORKERS) as executor:
+        # executor.map preserves range order, so entries come out in
+        # playlist order while later ranges extract in the background.
+        for info in executor.map(
+            lambda items: _extract_info(playlist_url, playlist_items=items), ranges
+        ):
+            yield from _iter_entries(info)
+
+
+# ==========================
+# JSON HELPERS
+# ==========================
 
-    return videos
+def dumps_json(data) -> bytes:
+    """
+    Serialize to UTF-8 JSON bytes, honoring the PRETTY flag.
+    Uses orjson when available, stdlib json otherwise.
+    """
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 if PRETTY else 0)
+    if PRETTY:
+        return json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads_json(payload: bytes):
+    """
+    Parse UTF-8 JSON bytes with orjson when available.
+    """
+    if orjson is not None:
+        return orjson.loads(payload)
+    return json.loads(payload.decode("utf-8"))
+
+
+def _dumps_compact(data) -> bytes:
+    """
+    Always-compact variant of dumps_json, for fragments that get
+    spliced into hand-assembled JSON documents.
+    """
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+# ==========================
+# TRANSCRIPT CACHE
+# ==========================
+
+_cache_conn: Optional[sqlite3.Connection] = None
+
+
+def _get_cache_conn() -> sqlite3.Connection:
+    """
+    Open (and lazily initialize) the local transcript cache database.
+    """
+    global _cache_conn
+    if _cache_conn is None:
+        _cache_conn = sqlite3.connect(CACHE_DB_PATH)
+        _cache_conn.execute(
+            "CREATE TABLE IF NOT EXISTS transcripts ("
+            "video_id TEXT NOT NULL, "
+            "langs TEXT NOT NULL, "
+            "json BLOB NOT NULL, "
+            "fetched_at REAL NOT NULL, "
+            "PRIMARY KEY (video_id, langs))"
+        )
+    return _cache_conn
+
+
+def _cache_get(video_id: str, languages: List[str]) -> Optional[bytes]:
+    """
+    Return the cached segments JSON array for (video_id, languages),
+    or None on a miss.
+    """
+    row = _get_cache_conn().execute(
+        "SELECT json FROM transcripts WHERE video_id = ? AND langs = ?",
+        (video_id, ",".join(languages)),
+    ).fetchone()
+    if row is None:
+        return None
+    return zlib.decompress(row[0])
+
+
+def _cache_put(video_id: str, languages: List[str], segments_json: bytes) -> None:
+    """
+    Store the serialized segments in the cache (compressed JSON blob).
+    """
+    blob = zlib.compress(segments_json)
+    conn = _get_cache_conn()
+    conn.execute(
+        "INSERT OR REPLACE INTO transcripts (video_id, langs, json, fetched_at) "
+        "VALUES (?, ?, ?, ?)",
+        (video_id, ",".join(languages), blob, time.time()),
+    )
+    conn.commit()
 
 
 # ==========================
 # TRANSCRIPT HANDLING
 # ==========================
 
-def fetch_transcript_for_video(
+def _build_http_session() -> requests.Session:
+    """
+    Build the requests.Session for one worker thread, so keep-alive
+    sockets (and their TLS handshakes) are reused across all the videos
+    that thread fetches instead of being re-established per call.
+    Transient errors and 429s are retried with backoff at the adapter
+    level.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=MAX_CONCURRENT_FETCHES,
+        pool_maxsize=MAX_CONCURRENT_FETCHES,
+        max_retries=Retry(
+            total=3,
+            backoff_factor=1,
+            status_forcelist=[429, 500, 502, 503, 504],
+        ),
+    )
+    session.mount("https://", adapter)
+    return session
+
+
+# YouTubeTranscriptApi is not thread-safe (a fetch can mutate session
+# state such as the consent cookie jar), so each worker thread gets its
+# own instance, built lazily on first use and reused for every video
+# that thread handles.
+_thread_api = threading.local()
+
+
+def _fetch_in_thread(video_id: str, languages: Optional[List[str]] = None):
+    """
+    Run one fetch on the calling worker thread's own API instance,
+    with the default languages bound once per thread instead of per
+    call. Intended to run inside asyncio.to_thread.
+    """
+    if not hasattr(_thread_api, "fetch_default"):
+        api = YouTubeTranscriptApi(http_client=_build_http_session())
+        _thread_api.api = api
+        _thread_api.fetch_default = functools.partial(
+            api.fetch, languages=PREFERRED_LANGUAGES
+        )
+    if languages is None:
+        return _thread_api.fetch_default(video_id)
+    return _thread_api.api.fetch(video_id, languages=languages)
+
+
+def _serialize_segments(fetched) -> bytes:
+    """
+    Serialize segments straight off the fetched transcript's snippet
+    objects, skipping the intermediate list of dicts that to_raw_data()
+    would build only for the JSON encoder to walk it a second time.
+    """
+    return b"[" + b",".join(
+        _dumps_compact(
+            {"text": snippet.text, "start": snippet.start, "duration": snippet.duration}
+        )
+        for snippet in fetched
+    ) + b"]"
+
+
+async def fetch_transcript_for_video(
     video_id: str,
     languages: Optional[List[str]] = None,
-) -> Optional[List[Dict]]:
+    limiter: Optional[AsyncLimiter] = None,
+) -> Optional[bytes]:
     """
     Fetch transcript segments for a video using youtube-transcript-api.
-    Uses the instance-based API (YouTubeTranscriptApi().fetch),
+    Uses the instance-based API (one instance per worker thread),
     which works with both manually created and auto-generated subtitles.
+    The sync API call runs in a worker thread so the event loop can
+    keep other fetches in flight.
 
-    Returns a list of segments like:
+    Returns the segments serialized as a JSON array (bytes), like:
         [{"text": "...", "start": 0.0, "duration": 3.2}, ...]
-    or None if not available.
+    or None if not available. The same bytes feed the cache and the
+    save path, so each transcript is serialized exactly once.
+
+    The limiter, when given, guards only the actual network call, so
+    cache hits never spend a token from the politeness budget.
     """
+    # None means "use the defaults bound per worker thread"; only the
+    # cache key needs the resolved list.
+    requested_languages = languages
     if languages is None:
         languages = PREFERRED_LANGUAGES
 
+    cached = _cache_get(video_id, languages)
+    if cached is not None:
+        print(f"  Using cached transcript for {video_id}")
+        return cached
+
     try:
         print(f"  Trying to fetch transcript for {video_id} with languages: {languages}")
-        api = YouTubeTranscriptApi()
-        fetched = api.fetch(video_id, languages=languages)
-        segments = fetched.to_raw_data()
-        print(f"  Got {len(segments)} transcript snippets")
-        return segments
+        if limiter is None:
+            fetched = await asyncio.to_thread(
+                _fetch_in_thread, video_id, requested_languages
+            )
+        else:
+            async with limiter:
+                fetched = await asyncio.to_thread(
+                    _fetch_in_thread, video_id, requested_languages
+                )
+        segments_json = _serialize_segments(fetched)
+        print(f"  Got {len(fetched)} transcript snippets")
+        _cache_put(video_id, languages, segments_json)
+        return segments_json
     except (TranscriptsDisabled, NoTranscriptFound, VideoUnavailable) as e:
         print(f"  Transcript not available for {video_id}: {e}")
         return None
@@ -110,15 +365,19 @@ def fetch_transcript_for_video(
         return None
 
 
+# Maps every filesystem-unsafe character to "_" in one translate() pass.
+_SANITIZE_TABLE = str.maketrans({ch: "_" for ch in '<>:"/\\|?*'})
+
+
+@functools.lru_cache(maxsize=8192)
 def sanitize_filename(name: str) -> str:
     """
-    Make a safe filename from a video title.
+    Make a safe filename from a video title. Pure function of name, so
+    repeat titles (re-runs, resume passes) hit the cache instead of
+    re-translating.
     """
-    invalid_chars = '<>:"/\\|?*'
-    for ch in invalid_chars:
-        name = name.replace(ch, "_")
-    # Remove very long names
-    return name.strip()[:150] or "untitled"
+    # Translate in a single C-level scan, then cap very long names
+    return name.translate(_SANITIZE_TABLE).strip()[:150] or "untitled"
 
 
 def build_transcript_filepath(
@@ -127,35 +386,60 @@ def build_transcript_filepath(
 ) -> str:
     """
     Build the output filepath for a video's transcript JSON.
+    The caller is responsible for creating output_dir (main() does this
+    once), keeping this helper side-effect-free and syscall-free.
     """
-    os.makedirs(output_dir, exist_ok=True)
-
     video_id = video.get("id", "")
     title = video.get("title", "")
     safe_title = sanitize_filename(title)
 
-    filename = f"{safe_title}__{video_id}.json"
+    filename = f"{safe_title}__{video_id}.json.gz"
     return os.path.join(output_dir, filename)
 
 
 def save_transcript(
     video: Dict[str, str],
-    segments: List[Dict],
+    segments_json: bytes,
     output_dir: str = OUTPUT_DIR,
+    filepath: Optional[str] = None,
 ) -> None:
     """
-    Save transcript as JSON, including video id, title, and segments.
+    Save transcript as gzipped JSON, including video id, title, and
+    segments. Transcript text compresses ~4-6x, so this cuts both disk
+    footprint and write bandwidth. Callers that already built the
+    filepath can pass it in to skip rebuilding it (sanitizing the title
+    is not free on hot paths).
     """
-    filepath = build_transcript_filepath(video, output_dir=output_dir)
-
-    data = {
-        "video_id": video.get("id", ""),
-        "title": video.get("title", ""),
-        "segments": segments,
-    }
-
-    with open(filepath, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    if filepath is None:
+        filepath = build_transcript_filepath(video, output_dir=output_dir)
+
+    if PRETTY:
+        # Slow path: re-parse so the whole document pretty-prints.
+        payload = dumps_json(
+            {
+                "video_id": video.get("id", ""),
+                "title": video.get("title", ""),
+                "segments": loads_json(segments_json),
+            }
+        )
+    else:
+        # Splice the already-serialized segments array into the wrapper
+        # document, so segments are never re-walked here.
+        payload = (
+            b'{"video_id":' + _dumps_compact(video.get("id", ""))
+            + b',"title":' + _dumps_compact(video.get("title", ""))
+            + b',"segments":' + segments_json + b"}"
+        )
+
+    # Write to a temp name and atomically rename into place: a crash
+    # mid-write can never leave a truncated .json that the resume scan
+    # would mistake for a finished transcript. No explicit fsync; the
+    # kernel batches the flushes far more efficiently than per-file
+    # syncs would.
+    tmp_path = filepath + ".tmp"
+    with gzip.open(tmp_path, "wb", compresslevel=6) as f:
+        f.write(payload)
+    os.replace(tmp_path, filepath)
 
     print(f"  Saved transcript to: {filepath}")
 
@@ -164,63 +448,125 @@ def save_transcript(
 # MAIN SCRIPT
 # ==========================
 
-def main() -> None:
-    if "PASTE_YOUR_PLAYLIST_ID_HERE" in PLAYLIST_URL:
-        print("Please edit PLAYLIST_URL in main.py and put your real playlist URL.")
-        return
-
-    print("Fetching playlist information...")
-    videos = get_videos_from_playlist(PLAYLIST_URL)
-    total = len(videos)
-    print(f"Found {total} video(s) in playlist.")
-
-    if total == 0:
-        return
+def scan_saved_video_ids(output_dir: str = OUTPUT_DIR) -> Set[str]:
+    """
+    Collect the video ids that already have a saved transcript file,
+    parsed from the "<title>__<video_id>.json.gz" filenames (plain
+    .json from older runs counts too). One directory scan replaces a
+    stat() syscall per video in the resume check.
+    """
+    done_ids: Set[str] = set()
+    for entry in os.scandir(output_dir):
+        name = entry.name
+        if name.endswith(".json.gz"):
+            name = name.removesuffix(".json.gz")
+        elif name.endswith(".json"):
+            name = name.removesuffix(".json")
+        else:
+            continue
+        done_ids.add(name.rsplit("__", 1)[-1])
+    return done_ids
 
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-    for index, video in enumerate(videos, start=1):
+async def process_video(
+    index: int,
+    video: Dict[str, str],
+    semaphore: asyncio.Semaphore,
+    limiter: AsyncLimiter,
+) -> None:
+    """
+    Handle one video end to end: fetch and save. The driver has already
+    filtered out videos with a saved transcript. Holds a semaphore slot
+    while running so the driver controls how many of these are in
+    flight; the shared limiter spreads the actual YouTube requests over
+    the global politeness budget.
+    """
+    async with semaphore:
         video_id = video["id"]
         title = video.get("title", "")
 
-        print(f"\n[{index}/{total}] Processing video:")
+        print(f"\n[{index}] Processing video:")
         print(f"  ID: {video_id}")
         print(f"  Title: {title}")
 
-        # Simple resume system: skip videos that already have a saved transcript file
-        existing_path = build_transcript_filepath(video, output_dir=OUTPUT_DIR)
-        if os.path.exists(existing_path):
-            print(f"  Transcript already exists at: {existing_path}")
-            # Still sleep a bit before moving to the next video
-            delay = random.uniform(MIN_DELAY_SECONDS, MAX_DELAY_SECONDS)
-            print(f"  Sleeping for {delay:.1f} seconds before next video...")
-            time.sleep(delay)
-            continue
-
-        segments = fetch_transcript_for_video(video_id)
+        segments_json = await fetch_transcript_for_video(video_id, limiter=limiter)
 
-        if not segments:
+        if segments_json is None:
             print("  No transcript, skipping save.")
         else:
-            save_transcript(video, segments)
+            await asyncio.to_thread(save_transcript, video, segments_json)
+
 
-        # Random delay between videos to be gentle with YouTube
-        delay = random.uniform(MIN_DELAY_SECONDS, MAX_DELAY_SECONDS)
-        print(f"  Sleeping for {delay:.1f} seconds...")
-        time.sleep(delay)
+async def main() -> None:
+    if "PASTE_YOUR_PLAYLIST_ID_HERE" in PLAYLIST_URL:
+        print("Please edit PLAYLIST_URL in main.py and put your real playlist URL.")
+        return
 
-        # Long cool-down after each batch of BATCH_SIZE videos (except after the last one)
-        if index % BATCH_SIZE == 0 and index < total:
+    print("Fetching playlist information...")
+    videos = iter_videos_from_playlist(PLAYLIST_URL)
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    done_ids = scan_saved_video_ids(OUTPUT_DIR)
+
+    # Size the asyncio.to_thread executor to the fetch concurrency (plus
+    # headroom for the save calls): its default of min(32, cpus + 4)
+    # threads can silently cap in-flight requests on small hosts. The
+    # HTTP connection pool is already sized to MAX_CONCURRENT_FETCHES.
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(
+        ThreadPoolExecutor(max_workers=MAX_CONCURRENT_FETCHES + 2)
+    )
+
+    # Bound how many fetches run concurrently, and share one token
+    # bucket so all workers together honor the global request rate.
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_FETCHES)
+    limiter = AsyncLimiter(REQUESTS_PER_MINUTE, time_period=60)
+
+    # Consume the generator in batches so fetching starts as soon as the
+    # first slice is available, with the long cool-down between batches.
+    processed = 0
+    while True:
+        batch = list(itertools.islice(videos, BATCH_SIZE))
+        if not batch:
+            break
+
+        # Long cool-down between batches of BATCH_SIZE videos
+        if processed:
             print(
-                f"\nProcessed {index} videos, taking a long rest of "
+                f"\nProcessed {processed} videos, taking a long rest of "
                 f"{BATCH_REST_SECONDS} seconds..."
             )
-            time.sleep(BATCH_REST_SECONDS)
+            await asyncio.sleep(BATCH_REST_SECONDS)
+
+        tasks = []
+        for offset, video in enumerate(batch):
+            index = processed + offset + 1
+
+            # Simple resume system: already-saved videos are skipped
+            # right here, before task creation, so they cost neither a
+            # task nor a jitter sleep.
+            if video["id"] in done_ids:
+                print(f"\n[{index}] Transcript already saved for {video['id']}, skipping.")
+                continue
+
+            tasks.append(
+                asyncio.create_task(
+                    process_video(index, video, semaphore, limiter)
+                )
+            )
+            # Jitter at the dispatch side; workers themselves never sleep.
+            await asyncio.sleep(random.uniform(*SUBMIT_JITTER_SECONDS))
+        await asyncio.gather(*tasks)
+        processed += len(batch)
+
+    if processed == 0:
+        print("No videos found in playlist.")
+        return
 
-    print("\nDone processing all videos.")
+    print(f"\nDone processing {processed} video(s).")
 
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
 
 